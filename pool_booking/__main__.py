@@ -3,7 +3,7 @@
 in the background, booking pool slots automatically, until it is terminated."""
 
 
-from typing import List, NamedTuple
+from typing import List, NamedTuple, Optional
 
 
 import argparse
@@ -14,7 +14,10 @@ import logging
 import time
 
 
-from .booking import Booker, BookingError
+from .booking import Booker, BookingError, SlotUnavailableError
+from .clock import ServerClock
+from .history import AvailabilityStore, PollingPlanner
+from .memory import MemoryMonitor
 
 
 def get_preferences(filename: str) -> List[int]:
@@ -48,10 +51,14 @@ def get_preferences(filename: str) -> List[int]:
     return pref
 
 
-def get_next_booking(pref: List[int]) -> datetime.datetime:
+def get_next_booking(
+        pref: List[int],
+        now: Optional[datetime.datetime] = None) -> datetime.datetime:
     """Given a list of preferred booking times and their days of the week,
-    find the next booking that needs to be made."""
-    now = datetime.datetime.now()
+    find the next booking that needs to be made.  The current time defaults to
+    the local time; pass the server's time to follow the server's clock."""
+    if now is None:
+        now = datetime.datetime.now()
     for inc in range(7):
         hours = pref[(now.weekday() + inc) % 7]
         if hours == 0:
@@ -63,21 +70,80 @@ def get_next_booking(pref: List[int]) -> datetime.datetime:
     raise Exception('No booking preferences were found.')
 
 
-def wait_next_booking(next_booking: datetime.date) -> None:
-    """Pause execution until the next booking time is reached."""
+def wait_next_booking(
+        next_booking: datetime.date,
+        clock: Optional[ServerClock] = None) -> None:
+    """Pause execution until the next booking time is reached.  If a server
+    clock is given, the booking time is taken as a server time and execution
+    resumes early enough for a request to reach the server at that time."""
+    if clock is not None:
+        next_booking = clock.send_time(next_booking)
     rest = (next_booking - datetime.datetime.now()).total_seconds() // 2
     while datetime.datetime.now() < next_booking and rest > 0:
         logging.debug('Sleeping for %i seconds', rest)
         time.sleep(rest)
         rest = (next_booking - datetime.datetime.now()).total_seconds() // 2
+    if clock is not None:
+        # Sleep off the last couple of seconds too so the request is sent on
+        # time rather than up to two seconds early.
+        rest = (next_booking - datetime.datetime.now()).total_seconds()
+        if rest > 0:
+            time.sleep(rest)
+
+
+def attempt_booking(
+        booker: Booker,
+        slot: datetime.datetime,
+        clock: ServerClock,
+        planner: Optional[PollingPlanner] = None,
+        monitor: Optional[MemoryMonitor] = None) -> None:
+    """Try to book a slot.  If a polling planner is given and the slot was
+    unavailable, the booking is retried at the times it plans until the slot
+    starts.  Other failures, such as a failed login, are not retried.  Retries
+    reuse the login session, logging in again at most once per slow polling
+    interval or when the session seems to have expired.  If a memory monitor
+    is given, it is cycled before each retry, since retrying can go on for
+    days."""
+    logged_in = None
+    while True:
+        now = clock.server_now()
+        login = logged_in is None or (
+            planner is not None and now - logged_in >= planner.slow)
+        try:
+            logging.info('Attempting to book time slot %s...', str(slot))
+            booker.book(slot, authenticate=login)
+            logging.info('Booking successful!')
+            return
+        except SlotUnavailableError as error:
+            logging.critical('Failed to book slot %s', str(slot))
+            logging.critical('Error: %s', str(error))
+            if login:
+                logged_in = now
+        except BookingError as error:
+            logging.critical('Failed to book slot %s', str(slot))
+            logging.critical('Error: %s', str(error))
+            if login:
+                return
+            # The session may have expired: log in again on the next try.
+            logged_in = None
+        if planner is None:
+            return
+        retry = planner.next_poll(slot, clock.server_now())
+        if retry >= slot:
+            return
+        logging.info('Retrying at %s.', str(retry))
+        wait_next_booking(retry, clock)
+        if monitor is not None:
+            monitor.cycle()
 
 
 def parse_args() -> NamedTuple:
     """Parse command line arguments.
 
     Returns:
-        NamedTuple containing the name of the schedule file to read and the
-        desired logging level.
+        NamedTuple containing the name of the schedule file to read, the
+        desired logging level, the memory instrumentation options and the
+        availability history file.
     """
     parser = argparse.ArgumentParser(description='Automate NTU pool booking.')
     parser.add_argument(
@@ -91,6 +157,24 @@ def parse_args() -> NamedTuple:
         default='INFO',
         help='Logging level for this script.',
         choices=['DEBUG', 'INFO', 'WARN', 'ERROR', 'CRITICAL'])
+    parser.add_argument(
+        '-m',
+        '--memory-budget',
+        default=None,
+        type=int,
+        help='Resident set size in MB above which a warning is logged.')
+    parser.add_argument(
+        '-t',
+        '--trace-memory',
+        action='store_true',
+        help='Log the top allocation sites of each booking cycle.')
+    parser.add_argument(
+        '-s',
+        '--history',
+        default=None,
+        help='Path to CSV file in which to record the availability of each '
+             'lane.  If given, bookings that fail because the slot is taken '
+             'are retried, more often when slots have freed up in the past.')
     return parser.parse_args()
 
 
@@ -104,7 +188,18 @@ def main() -> None:
     username = input('NTU Network User Name: ')
     matricno = input('Matriculation Number: ')
     password = getpass.getpass(prompt='NTU Network Password ')
-    booker = Booker(username, password, matricno)
+    clock = ServerClock()
+    history = AvailabilityStore(args.history) if args.history else None
+    planner = PollingPlanner(history) if history else None
+    booker = Booker(
+        username,
+        password,
+        matricno,
+        clock=clock,
+        history=history)
+    monitor = MemoryMonitor(
+        args.memory_budget * 1024 * 1024 if args.memory_budget else None,
+        args.trace_memory)
 
     # Begin main loop
     logging.info('Launching Pool Booking Script...')
@@ -113,9 +208,12 @@ def main() -> None:
     logging.info('Reading preferred booking slots...')
     next_slot = datetime.datetime.now()
     while True:
+        monitor.cycle()
         try:
             logging.info('Finding next preferred booking slot...')
-            next_slot = get_next_booking(get_preferences(args.schedule_file))
+            next_slot = get_next_booking(
+                get_preferences(args.schedule_file),
+                clock.server_now())
         except (AttributeError, IndexError) as error:
             logging.critical(
                 'Error occurred reading preferences file.  Please ensure that '
@@ -125,16 +223,10 @@ def main() -> None:
             wait_next_booking(
                 datetime.datetime.now() + datetime.timedelta(hours=1))
             continue
-        try:
-            logging.info('Attempting to book time slot %s...', str(next_slot))
-            booker.book(next_slot)
-            logging.info('Booking successful!')
-        except BookingError as error:
-            logging.critical('Failed to book slot %s', str(next_slot))
-            logging.critical('Error: %s', str(error))
+        attempt_booking(booker, next_slot, clock, planner, monitor)
         sleep_time = next_slot + datetime.timedelta(hours=2)
         logging.info('Sleeping until %s.', str(sleep_time))
-        wait_next_booking(sleep_time)
+        wait_next_booking(sleep_time, clock)
 
 
 if __name__ == '__main__':
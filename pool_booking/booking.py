@@ -3,23 +3,34 @@ facilities booking website.  Given a date and time slot, this module contains
 the utilities to book it assuming proper login information is provided."""
 
 
-from typing import Dict, Union
+from typing import Any, Callable, Dict, Optional, Union
 
 
 import datetime
 import logging
-import re
 
 
 import bs4
 import requests
 
 
+from .clock import ServerClock
+from .history import AvailabilityStore
+from .schedule import (
+    CompactSchedule, ParseExecutor, parse_schedule, schedule_slots)
+
+
 class BookingError(Exception):
     """Exception raised by Booker class when an error occurs during booking due
     to the server not accepting a request."""
 
 
+class SlotUnavailableError(BookingError):
+    """Exception raised by Booker class when the desired slot has no free lane
+    or the booking of a free lane could not be confirmed, typically because
+    someone else booked it first.  Trying again later may succeed."""
+
+
 class Booker:
     """Booker books slots in the NTU sports facility web page.
 
@@ -27,13 +38,46 @@ class Booker:
         username: NTU user name.
         password: NTU password.
         matricno: NTU matriculation number.
+        clock: optional server clock estimate, updated with the timing of
+            every request sent to the server.
+        parser: optional executor used to parse the schedule page off the
+            calling thread.
+        history: optional store to which every schedule snapshot is
+            recorded.
     """
 
-    def __init__(self, username: str, password: str, matricno: str) -> None:
+    def __init__(  # pylint: disable=too-many-arguments
+            self,
+            username: str,
+            password: str,
+            matricno: str,
+            *,
+            clock: Optional[ServerClock] = None,
+            parser: Optional[ParseExecutor] = None,
+            history: Optional[AvailabilityStore] = None) -> None:
         self.username = username
         self.password = password
         self.matricno = matricno.upper()
         self.cookie_jar = {}
+        self.clock = clock
+        self.parser = parser
+        self.history = history
+
+    def send(self, method: Callable[..., Any], url: str, **kwargs) -> Any:
+        """Send a request to the server, sampling the server clock if one is
+        set.
+
+        Args:
+            method: function sending the request, e.g. requests.get.
+            url: URL of the request.
+            **kwargs: keyword arguments passed to method.
+
+        Returns:
+            The response returned by method.
+        """
+        if self.clock is None:
+            return method(url, **kwargs)
+        return self.clock.request(method, url, **kwargs)
 
     def authenticate(self) -> None:
         """Authenticate with the NTU facilities booking web page.  Return the
@@ -43,7 +87,8 @@ class Booker:
         Raises:
             BookingError: if the authentication fails.
         """
-        response = requests.post(
+        response = self.send(
+            requests.post,
             'https://sso.wis.ntu.edu.sg/webexe88/owa/sso.asp',
             headers=self.get_headers(),
             data={
@@ -92,17 +137,14 @@ class Booker:
             'Cookie': ';'.join(
                 [f'{key}={value}' for key, value in self.cookie_jar.items()])}
 
-    def check_schedule(self) -> Dict[datetime.datetime, Union[str, None]]:
-        """Get the availabe booking slots for the comming week.  Note: this
-        code is very brittle and small changes to the format of the booking
-        page could break it.
+    def fetch_schedule(self) -> CompactSchedule:
+        """Get the schedule for the comming week in compact form, including
+        every free lane of each booking slot.  The page is parsed by the parse
+        executor if one is set, and the snapshot is recorded to the history
+        store if one is set.
 
         Returns:
-            Dictionary whose keys are a datetime object corresponding to the
-            start of a booking slot and whose values are a string containing
-            the lane information required to book this slot if desired.  If the
-            value for a booking slot is None, it means there are no available
-            lanes at that time.
+            The schedule in compact form, see schedule.parse_schedule.
 
         Raises:
             BookingError: if something went wrong while parsing the schedule
@@ -110,7 +152,8 @@ class Booker:
             error message accompanying the BookingError will provide more
             details depending on the case.
         """
-        response = requests.get(
+        response = self.send(
+            requests.get,
             f'https://wis.ntu.edu.sg/pls/webexe88/srce_smain_s.srce$sel31_o?'
             f'p1={self.matricno}&p2=&p_info=2SP225',
             headers=self.get_headers())
@@ -119,50 +162,45 @@ class Booker:
             response.status_code)
         if response.status_code != 200:
             raise BookingError('Schedule page not available.')
+        page = response.content
+        del response
         try:
-            slots = {}
-            rows = bs4.BeautifulSoup(
-                response.text,
-                features='html.parser').find(
-                    'table',
-                    style='border-collapse:collapse;').find_all('tr')
-            dates = {}
-            for idx, cell in enumerate(rows[0].find_all('td')[2:]):
-                date = re.match(
-                    r'(?P<day>\d{2})(?P<month>\D{3})\s+(?P<year>\d{4})',
-                    cell.get_text()).groupdict()
-                dates[idx] = datetime.datetime(
-                    int(date['year']),
-                    datetime.datetime.strptime(date['month'], '%b').month,
-                    int(date['day']))
-            hour = 0
-            for row in rows[1:]:
-                cells = row.find_all('td')
-                if len(cells) == 10:
-                    hour = int(
-                        re.match(
-                            r'(\d{2})\d{2}\s+\-\s+\d{4}',
-                            cells[0].get_text())[1])
-                    cells = cells[1:]
-                cells = cells[1:]
-                for idx, cell in enumerate(cells):
-                    content = cell.find('input')
-                    cell_date = datetime.datetime(
-                        dates[idx].year,
-                        dates[idx].month,
-                        dates[idx].day,
-                        hour=hour)
-                    if cell_date not in slots:
-                        slots[cell_date] = None
-                    if content:
-                        slots[cell_date] = content.get('value')
-            return slots
+            if self.parser is None:
+                schedule = parse_schedule(page)
+            else:
+                schedule = self.parser.parse(page)
         except AttributeError as error:
             logging.error(
                 'Could not check schedule.  This is likey do to a page format '
                 'change.  Please open an issue on Github to notify the repo '
                 'maintainers. ')
             raise BookingError('Could not parse schedule.') from error
+        if self.history is not None:
+            changes = self.history.record(
+                schedule,
+                self.clock.server_now() if self.clock else None)
+            logging.debug('%i lanes changed since last snapshot', changes)
+        return schedule
+
+    def check_schedule(self) -> Dict[datetime.datetime, Union[str, None]]:
+        """Get the availabe booking slots for the comming week.  Note: this
+        code is very brittle and small changes to the format of the booking
+        page could break it.
+
+        Returns:
+            Dictionary whose keys are a datetime object corresponding to the
+            start of a booking slot and whose values are a string containing
+            the lane information required to book this slot if desired.  If the
+            value for a booking slot is None, it means there are no available
+            lanes at that time.
+
+        Raises:
+            BookingError: if something went wrong while parsing the schedule
+            page contents OR if the schedule page cannot be reached.  The
+            error message accompanying the BookingError will provide more
+            details depending on the case.
+        """
+        return schedule_slots(self.fetch_schedule())
 
     def book_slot(self, slot: datetime.datetime, info: str) -> None:
         """Book a slot with the information received from check_schedule.
@@ -176,7 +214,8 @@ class Booker:
             BookingError: if the booking cannot be completed.
         """
         # Book
-        response = requests.post(
+        response = self.send(
+            requests.post,
             'https://wis.ntu.edu.sg/pls/webexe88/srce_sub1.srceb$sel32',
             headers=self.get_headers(),
             data={
@@ -189,17 +228,25 @@ class Booker:
             response.status_code)
         frmk = ''
         p_info = ''
+        soup = bs4.BeautifulSoup(
+            response.text,
+            features='html.parser',
+            parse_only=bs4.SoupStrainer('input'))
         try:
-            soup = bs4.BeautifulSoup(response.text, features='html.parser')
             frmk = soup.find('input', {'name': 'frmk'}).get('value')
             p_info = soup.find('input', {'name': 'P_info'}).get('value')
         except AttributeError as error:
+            # An expired session gives the same page, so this is not taken
+            # to mean that the slot is unavailable.
             raise BookingError('Initial booking failed.') from error
+        finally:
+            soup.decompose()
         logging.debug('frmk=%s', frmk)
         logging.debug('P_info=%s', p_info)
 
         # Confirm
-        response = requests.post(
+        response = self.send(
+            requests.post,
             'https://wis.ntu.edu.sg/pls/webexe88/srce_sub1.srceb$sel33',
             headers=self.get_headers(),
             data={
@@ -225,21 +272,30 @@ class Booker:
             response.status_code)
         if 'Official Permit' not in response.text:
             logging.error('Confirmation failed: invalid access.')
-            raise BookingError('Booking confirmation failed')
+            raise SlotUnavailableError('Booking confirmation failed')
 
-    def book(self, time: datetime.datetime) -> None:
+    def book(
+            self,
+            time: datetime.datetime,
+            authenticate: bool = True) -> None:
         """Book a lane in the pool at a desired time.  The next free lane
         will always be booked unless there are no more lanes available at that
         time.
 
         Args:
             time: a datetime object referring to the desired pool booking time.
+            authenticate: if False, reuse the session of the previous
+                authentication instead of logging in again.
 
         Raises:
-            BookingError: if no slot is available at that the desired time.
+            SlotUnavailableError: if no slot is available at that the desired
+            time or its booking could not be confirmed.
+            BookingError: if any other step of the booking fails.
         """
-        self.authenticate()
+        if authenticate:
+            self.authenticate()
         slots = self.check_schedule()
         if slots[time] is None:
-            raise BookingError('No avaiable places at the desired time.')
+            raise SlotUnavailableError(
+                'No avaiable places at the desired time.')
         self.book_slot(time, slots[time])
@@ -0,0 +1,143 @@
+"""Utilities to estimate the booking server's clock from the responses it
+sends.  Slots are released according to the server's clock, not ours, so
+requests that need to arrive at a precise server time must be sent early by
+the clock offset and half of the network round trip time."""
+
+
+from typing import Any, Callable, NamedTuple
+
+
+import collections
+import datetime
+import email.utils
+import logging
+import threading
+import time
+
+
+class ClockSample(NamedTuple):
+    """A single measurement of the server clock.  The server generated its
+    response some time between sending the request and receiving the response,
+    and its Date header is truncated to the second, so each sample only bounds
+    the clock offset.
+
+    Args:
+        low: lowest possible server time minus local time, in seconds.
+        high: highest possible server time minus local time, in seconds.
+        rtt: round trip time of the request, in seconds.
+    """
+    low: float
+    high: float
+    rtt: float
+
+
+class ServerClock:
+    """ServerClock estimates the server clock offset and the network round
+    trip time based on the Date header of server responses.  The offset is the
+    middle of the range allowed by all recent samples, which narrows as samples
+    are taken at different points within the server's second.  A single
+    clock may be shared by several Bookers of the same server, including
+    Bookers used from different threads.
+
+    Args:
+        alpha: weight given to a new measurement when updating the smoothed
+            round trip time (0 < alpha <= 1).
+        window: number of recent samples whose bounds are combined to
+            estimate the offset.
+    """
+
+    def __init__(self, alpha: float = 0.25, window: int = 32) -> None:
+        self.alpha = alpha
+        self.samples = collections.deque(maxlen=window)
+        self.offset = None
+        self.uncertainty = None
+        self.rtt = None
+        self.lock = threading.Lock()
+
+    def request(self, send: Callable[..., Any], *args, **kwargs) -> Any:
+        """Send a request, timing it and sampling the server clock from its
+        response.
+
+        Args:
+            send: function sending the request, e.g. requests.get.
+            *args: positional arguments passed to send.
+            **kwargs: keyword arguments passed to send.
+
+        Returns:
+            The response returned by send.
+        """
+        sent = time.time()
+        response = send(*args, **kwargs)
+        self.sample(response, sent, time.time())
+        return response
+
+    def sample(self, response: Any, sent: float, received: float) -> None:
+        """Update the offset and round trip time estimates with a response.
+        Responses without a valid Date header are ignored.
+
+        Args:
+            response: the response received from the server.
+            sent: local time at which the request was sent (seconds since the
+                epoch).
+            received: local time at which the response was received (seconds
+                since the epoch).
+        """
+        date = getattr(response, 'headers', {}).get('Date')
+        if not date:
+            return
+        try:
+            server = email.utils.parsedate_to_datetime(date)
+        except (TypeError, ValueError):
+            logging.debug('Could not parse Date header: %s', date)
+            return
+        if server.tzinfo is None:
+            server = server.replace(tzinfo=datetime.timezone.utc)
+        rtt = max(received - sent, 0.0)
+        with self.lock:
+            self.samples.append(ClockSample(
+                server.timestamp() - received,
+                server.timestamp() + 1 - sent,
+                rtt))
+            # Intersect the bounds from the newest sample back.  If the bounds
+            # stop overlapping the offset has changed, so older samples are
+            # dropped.
+            low, high = float('-inf'), float('inf')
+            for count, sample in enumerate(reversed(self.samples)):
+                if max(low, sample.low) > min(high, sample.high):
+                    for _ in range(len(self.samples) - count):
+                        self.samples.popleft()
+                    break
+                low, high = max(low, sample.low), min(high, sample.high)
+            self.offset = (low + high) / 2
+            self.uncertainty = (high - low) / 2
+            if self.rtt is None:
+                self.rtt = rtt
+            else:
+                self.rtt += self.alpha * (rtt - self.rtt)
+            estimate = (self.offset, self.uncertainty, self.rtt)
+        logging.debug(
+            'Server clock offset %.3f s (+/- %.3f s), round trip time %.3f s',
+            *estimate)
+
+    def server_now(self) -> datetime.datetime:
+        """Estimate the current time on the server.
+
+        Returns:
+            The local time corrected by the estimated offset.  If no samples
+            have been taken yet, the local time is returned.
+        """
+        return datetime.datetime.now() + \
+            datetime.timedelta(seconds=self.offset or 0.0)
+
+    def send_time(self, target: datetime.datetime) -> datetime.datetime:
+        """Find the local time at which a request should be sent so that it
+        reaches the server at a given server time.
+
+        Args:
+            target: the server time at which the request should arrive.
+
+        Returns:
+            The local time at which the request should be sent.
+        """
+        return target - datetime.timedelta(
+            seconds=(self.offset or 0.0) + (self.rtt or 0.0) / 2)
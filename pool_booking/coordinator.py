@@ -0,0 +1,165 @@
+"""Coordination of several accounts competing for the same slots.  Instead
+of every account checking the schedule and trying to book the same free lane,
+one schedule snapshot is taken for all of them, the free lanes of each slot are
+shared out among the accounts that want it by priority and fairness, and each
+account then books its own lane in parallel."""
+
+
+from typing import Any, Callable, List, NamedTuple, Optional, Union
+
+
+import collections
+import concurrent.futures
+import datetime
+import logging
+
+
+import requests
+
+
+from .booking import Booker, BookingError, SlotUnavailableError
+from .schedule import CompactSchedule
+
+
+# Errors that make a single claim fail without affecting the others.
+ClaimError = Union[BookingError, requests.RequestException]
+
+
+class Claim(NamedTuple):
+    """An account's request to book a slot.
+
+    Args:
+        booker: the account making the request.
+        slot: the date and hour of the desired booking.
+        priority: claims with a higher priority are given lanes first.
+    """
+    booker: Booker
+    slot: datetime.datetime
+    priority: int = 0
+
+
+class Coordinator:
+    """Coordinator shares out the free lanes of a schedule snapshot among
+    competing claims so that no two accounts try to book the same lane.  Among
+    claims of equal priority, accounts that have booked fewer lanes through
+    this coordinator go first.
+
+    Args:
+        workers: maximum number of threads used to send requests, None for
+            one per claim.
+    """
+
+    def __init__(self, workers: Optional[int] = None) -> None:
+        self.workers = workers
+        self.wins = collections.Counter()
+
+    def assign(
+            self,
+            schedule: CompactSchedule,
+            claims: List[Claim]) -> List[Optional[str]]:
+        """Assign a distinct free lane to as many claims as possible.
+
+        Args:
+            schedule: the schedule snapshot, as returned by
+                Booker.fetch_schedule.
+            claims: the competing claims.
+
+        Returns:
+            The lane information assigned to each claim, in the same order as
+            the claims, or None if no free lane was left for a claim.
+        """
+        free = {}
+        for date, hour, lanes in schedule:
+            start = datetime.datetime.fromordinal(date).replace(hour=hour)
+            free[start] = list(lanes)
+        order = sorted(
+            range(len(claims)),
+            key=lambda idx: (
+                -claims[idx].priority,
+                self.wins[claims[idx].booker.matricno],
+                idx))
+        assigned = [None] * len(claims)
+        for idx in order:
+            lanes = free.get(claims[idx].slot)
+            if lanes:
+                assigned[idx] = lanes.pop()
+        return assigned
+
+    def book(self, claims: List[Claim]) -> List[Optional[ClaimError]]:
+        """Book a distinct lane for each claim.  Every account is
+        authenticated, one of them checks the schedule, the free lanes are
+        assigned and every account books its lane, all in parallel.
+
+        Args:
+            claims: the competing claims.
+
+        Returns:
+            For each claim, in the same order as the claims, None if the
+            booking succeeded or the BookingError or
+            requests.RequestException that made it fail.
+        """
+        if not claims:
+            return []
+        with concurrent.futures.ThreadPoolExecutor(
+                self.workers or len(claims),
+                thread_name_prefix='Coordinator') as pool:
+            results = list(pool.map(
+                lambda claim: attempt(claim.booker.authenticate),
+                claims))
+            ready = [idx for idx, error in enumerate(results) if error is None]
+            if not ready:
+                return results
+            try:
+                schedule = claims[ready[0]].booker.fetch_schedule()
+            except (BookingError, requests.RequestException) as error:
+                return [result or error for result in results]
+            assigned = self.assign(schedule, [claims[idx] for idx in ready])
+            futures = {}
+            for idx, info in zip(ready, assigned):
+                if info is None:
+                    results[idx] = SlotUnavailableError(
+                        'No avaiable places at the desired time.')
+                else:
+                    futures[idx] = pool.submit(
+                        attempt,
+                        claims[idx].booker.book_slot,
+                        claims[idx].slot,
+                        info)
+            for idx, future in futures.items():
+                results[idx] = future.result()
+        for claim, error in zip(claims, results):
+            if error is None:
+                self.wins[claim.booker.matricno] += 1
+                logging.info(
+                    'Booked slot %s for %s',
+                    str(claim.slot),
+                    claim.booker.matricno)
+            else:
+                logging.error(
+                    'Failed to book slot %s for %s: %s',
+                    str(claim.slot),
+                    claim.booker.matricno,
+                    str(error))
+        return results
+
+
+def attempt(
+        action: Callable[..., Any],
+        *args) -> Optional[ClaimError]:
+    """Run a booking action, catching the error it raises.  Connection
+    errors are caught too so that one account's network failure does not
+    lose the results of the others.
+
+    Args:
+        action: the action to run, e.g. Booker.authenticate.
+        *args: arguments passed to action.
+
+    Returns:
+        None if the action succeeded, otherwise the BookingError or
+        requests.RequestException it raised.
+    """
+    try:
+        action(*args)
+        return None
+    except (BookingError, requests.RequestException) as error:
+        return error
@@ -0,0 +1,295 @@
+"""Historical record of the availability of each lane in the pool.  Every
+schedule snapshot is compared with the previous one and only the lanes that
+changed are appended to a CSV file, so the store stays small however often the
+schedule is polled.  The recorded changes tell when slots usually free up or
+fill up, and the polling planner polls often only when lanes usually free
+up."""
+
+
+from typing import List, NamedTuple, Optional
+
+
+import csv
+import datetime
+import logging
+import os
+
+
+from .schedule import CompactSchedule
+
+
+# Kinds of change recorded in the store.  A lane is SEEN when its slot is
+# observed for the first time, which is not counted as a change.
+SEEN = 'S'
+FREED = 'F'
+TAKEN = 'T'
+
+
+class SlotChanges(NamedTuple):
+    """Number of changes observed within a window of time before a slot
+    starts.
+
+    Args:
+        lead: how long before the slot starts the window begins; the window
+            covers [lead, lead + bucket) before the slot.
+        freed: number of lanes that became free in the window.
+        taken: number of lanes that were taken in the window.
+    """
+    lead: datetime.timedelta
+    freed: int
+    taken: int
+
+
+def lane_number(info: str) -> int:
+    """Get the lane number from the lane information of a free lane.
+
+    Args:
+        info: lane information, as found in the schedule.
+
+    Returns:
+        The lane number.
+    """
+    return int(info[6:8])
+
+
+class AvailabilityStore:
+    """AvailabilityStore appends the changes between schedule snapshots to a
+    CSV file and keeps statistics of when changes happen for each weekday and
+    hour.  Each row of the file is: date ordinal, hour, lane, kind of change
+    and minutes before the slot started when the change was observed.
+
+    Args:
+        path: path of the CSV file.  It is created if it does not exist and
+            replayed to restore the statistics if it does.  Malformed rows,
+            such as a last row cut short when the daemon was killed, are
+            skipped.
+        bucket: width of the windows in which changes are counted.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            bucket: datetime.timedelta = datetime.timedelta(hours=1)) -> None:
+        self.path = path
+        self.bucket = int(bucket.total_seconds() // 60)
+        self.free = {}
+        self.counts = {}
+        if os.path.exists(path):
+            with open(path, newline='') as csvfile:
+                for number, row in enumerate(csv.reader(csvfile), 1):
+                    try:
+                        if row[3] not in (SEEN, FREED, TAKEN):
+                            raise ValueError(f'unknown change {row[3]!r}')
+                        self.apply(
+                            int(row[0]), int(row[1]), int(row[2]), row[3],
+                            int(row[4]))
+                    except (IndexError, ValueError) as error:
+                        logging.warning(
+                            'Skipping malformed row %i of %s: %s',
+                            number,
+                            path,
+                            str(error))
+            with open(path, 'rb') as csvfile:
+                csvfile.seek(0, os.SEEK_END)
+                if csvfile.tell():
+                    csvfile.seek(-1, os.SEEK_END)
+                    ended = csvfile.read() == b'\n'
+                else:
+                    ended = True
+            if not ended:
+                # End the cut short row so that new rows are not appended to
+                # it.
+                with open(path, 'a', newline='') as csvfile:
+                    csvfile.write('\r\n')
+            self.prune(datetime.datetime.now())
+
+    def apply(
+            self,
+            date: int,
+            hour: int,
+            lane: int,
+            kind: str,
+            lead: int) -> None:
+        """Apply a change to the last known state and the statistics.
+
+        Args:
+            date: date ordinal of the slot.
+            hour: hour of the slot.
+            lane: lane number.
+            kind: SEEN, FREED or TAKEN.
+            lead: minutes before the slot started when the change was
+                observed.
+        """
+        free = self.free.setdefault((date, hour), set())
+        if kind == TAKEN:
+            free.discard(lane)
+        else:
+            free.add(lane)
+        if kind == SEEN:
+            return
+        key = (datetime.date.fromordinal(date).weekday(), hour)
+        counts = self.counts.setdefault(key, {})
+        freed, taken = counts.get(lead // self.bucket, (0, 0))
+        if kind == FREED:
+            freed += 1
+        else:
+            taken += 1
+        counts[lead // self.bucket] = (freed, taken)
+
+    def record(
+            self,
+            schedule: CompactSchedule,
+            observed: Optional[datetime.datetime] = None) -> int:
+        """Append the changes since the previous snapshot to the store.
+
+        Args:
+            schedule: the schedule snapshot, as returned by
+                Booker.fetch_schedule.
+            observed: time at which the snapshot was taken, by default now.
+
+        Returns:
+            The number of lanes that were freed or taken since the previous
+            snapshot.
+        """
+        if observed is None:
+            observed = datetime.datetime.now()
+        rows = []
+        for date, hour, lanes in schedule:
+            start = datetime.datetime.fromordinal(date).replace(hour=hour)
+            if start <= observed:
+                continue
+            lead = int((start - observed).total_seconds() // 60)
+            free = {lane_number(info) for info in lanes}
+            last = self.free.get((date, hour))
+            if last is None:
+                # A sentinel lane marks slots that were seen with no free lane.
+                rows.extend(
+                    (date, hour, lane, SEEN, lead) for lane in free or {-1})
+                continue
+            rows.extend(
+                (date, hour, lane, FREED, lead)
+                for lane in sorted(free - last))
+            rows.extend(
+                (date, hour, lane, TAKEN, lead)
+                for lane in sorted(last - free - {-1}))
+        with open(self.path, 'a', newline='') as csvfile:
+            csv.writer(csvfile).writerows(rows)
+        for row in rows:
+            self.apply(*row)
+        self.prune(observed)
+        return sum(1 for row in rows if row[3] != SEEN)
+
+    def prune(self, now: datetime.datetime) -> None:
+        """Forget the state of slots that have already started.  Their
+        changes remain in the statistics.
+
+        Args:
+            now: the current time.
+        """
+        today = now.date().toordinal()
+        for date, hour in list(self.free):
+            if date < today or (date == today and hour <= now.hour):
+                del self.free[(date, hour)]
+
+    def changes(self, weekday: int, hour: int) -> List[SlotChanges]:
+        """Get the statistics of when slots at a given weekday and hour free
+        up or fill up.
+
+        Args:
+            weekday: day of the week (0 = Monday, ..., 6 = Sunday).
+            hour: hour of the slot.
+
+        Returns:
+            List of the windows in which changes were observed, closest to
+            the start of the slot first.
+        """
+        return [
+            SlotChanges(
+                datetime.timedelta(minutes=window * self.bucket),
+                freed,
+                taken)
+            for window, (freed, taken) in sorted(
+                self.counts.get((weekday, hour), {}).items())]
+
+
+class PollingPlanner:
+    """PollingPlanner decides when to poll the schedule for a slot next,
+    polling often in the windows before a slot in which lanes have
+    historically freed up and seldom otherwise.
+
+    Args:
+        store: the availability store providing the statistics.
+        fast: polling interval inside a busy window.
+        slow: polling interval outside busy windows.
+        coverage: fraction of the historically freed lanes that the busy
+            windows should cover.
+    """
+
+    def __init__(
+            self,
+            store: AvailabilityStore,
+            fast: datetime.timedelta = datetime.timedelta(minutes=1),
+            slow: datetime.timedelta = datetime.timedelta(hours=1),
+            coverage: float = 0.8) -> None:
+        self.store = store
+        self.fast = fast
+        self.slow = slow
+        self.coverage = coverage
+
+    def busy_windows(self, weekday: int, hour: int) -> List[SlotChanges]:
+        """Find the windows in which most lanes free up for slots at a given
+        weekday and hour.  Only freed lanes are counted: the planner is used
+        to retry slots that are full, and lanes being taken, such as when a
+        slot is released, cannot make a full slot bookable.
+
+        Args:
+            weekday: day of the week (0 = Monday, ..., 6 = Sunday).
+            hour: hour of the slot.
+
+        Returns:
+            The fewest windows covering the requested fraction of all freed
+            lanes, busiest first.
+        """
+        changes = sorted(
+            (
+                window for window in self.store.changes(weekday, hour)
+                if window.freed),
+            key=lambda window: window.freed,
+            reverse=True)
+        total = sum(window.freed for window in changes)
+        busy = []
+        covered = 0
+        for window in changes:
+            if covered >= self.coverage * total:
+                break
+            busy.append(window)
+            covered += window.freed
+        return busy
+
+    def next_poll(
+            self,
+            slot: datetime.datetime,
+            now: datetime.datetime) -> datetime.datetime:
+        """Decide when to poll the schedule for a slot next.  Without any
+        history, the schedule is polled at the slow interval.
+
+        Args:
+            slot: start of the desired slot.
+            now: the current time.
+
+        Returns:
+            The time of the next poll, never later than the start of the
+            slot.
+        """
+        busy = self.busy_windows(slot.weekday(), slot.hour)
+        if not busy:
+            return min(now + self.slow, slot)
+        bucket = datetime.timedelta(minutes=self.store.bucket)
+        lead = slot - now
+        for window in busy:
+            if window.lead <= lead < window.lead + bucket:
+                return min(now + self.fast, slot)
+        starts = [
+            slot - window.lead - bucket for window in busy
+            if slot - window.lead - bucket > now]
+        return min([now + self.slow, slot] + starts)
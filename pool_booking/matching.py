@@ -0,0 +1,93 @@
+"""Batch matching of many users' preferred booking times against a schedule.
+The preferences of all users are loaded into one weekday by hour matrix whose
+cells are bit sets of users, so matching a schedule costs one bit set lookup
+per slot with free lanes plus one step per match, however many users there
+are."""
+
+
+from typing import Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+
+import datetime
+
+
+from .schedule import CompactSchedule
+
+
+HOURS = 24
+
+
+class Match(NamedTuple):
+    """A slot with free lanes that a user wants to book.
+
+    Args:
+        user: the user wanting the slot.
+        slot: the date and hour of the slot.
+        lanes: lane information of every free lane at that time.
+    """
+    user: Hashable
+    slot: datetime.datetime
+    lanes: Tuple[str, ...]
+
+
+class PreferenceMatrix:
+    """PreferenceMatrix holds the preferred booking times of many users.  Each
+    cell of the weekday by hour matrix is a bit set of the users wanting to
+    book at that time on that day of the week.
+
+    Args:
+        preferences: dictionary whose keys are users and whose values are
+            their preferred booking times, as returned by get_preferences.
+    """
+
+    def __init__(self, preferences: Dict[Hashable, List[int]]) -> None:
+        self.users = []
+        self.cells = [0] * (7 * HOURS)
+        for user, pref in preferences.items():
+            self.add(user, pref)
+
+    def add(self, user: Hashable, pref: List[int]) -> None:
+        """Add a user's preferences to the matrix.
+
+        Args:
+            user: the user.
+            pref: the user's preferred booking times, as returned by
+                get_preferences.
+        """
+        row = 1 << len(self.users)
+        self.users.append(user)
+        for weekday, hour in enumerate(pref):
+            if hour:
+                self.cells[weekday * HOURS + hour] |= row
+
+    def match(
+            self,
+            schedule: CompactSchedule,
+            now: Optional[datetime.datetime] = None) -> List[Match]:
+        """Match every user's preferences against the free lanes of a
+        schedule.
+
+        Args:
+            schedule: the schedule snapshot, as returned by
+                Booker.fetch_schedule.
+            now: if given, slots starting at or before this time are
+                ignored.
+
+        Returns:
+            One match per user and wanted slot with free lanes, ordered by
+            slot and then by the order of the users.
+        """
+        matches = []
+        for date, hour, lanes in sorted(schedule):
+            if not lanes:
+                continue
+            slot = datetime.datetime.fromordinal(date).replace(hour=hour)
+            if now is not None and slot <= now:
+                continue
+            rows = self.cells[slot.weekday() * HOURS + hour]
+            while rows:
+                lowest = rows & -rows
+                matches.append(
+                    Match(self.users[lowest.bit_length() - 1], slot, lanes))
+                rows ^= lowest
+        return matches
@@ -0,0 +1,98 @@
+"""Memory instrumentation for the booking daemon.  The daemon runs for weeks
+at a time, so each cycle checks the resident set size against an optional
+budget and can report the allocation sites that grew since the last cycle."""
+
+
+from typing import Optional
+
+
+import gc
+import logging
+import os
+import sys
+import tracemalloc
+
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def current_rss() -> int:
+    """Get the resident set size of this process.
+
+    Returns:
+        The resident set size in bytes.  On platforms without /proc the peak
+        resident set size is returned instead, or 0 if it is not available.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemoryMonitor:
+    """MemoryMonitor checks the memory used by the daemon once per cycle.
+
+    Args:
+        budget: resident set size in bytes above which a warning is logged,
+            or None for no budget.
+        trace: if True, use tracemalloc to log the top allocation sites of
+            each cycle.
+        top: number of allocation sites to log per cycle.
+    """
+
+    def __init__(
+            self,
+            budget: Optional[int] = None,
+            trace: bool = False,
+            top: int = 10) -> None:
+        self.budget = budget
+        self.trace = trace
+        self.top = top
+        self.snapshot = None
+        if trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def cycle(self) -> int:
+        """Collect garbage left over from the previous cycle, check the
+        resident set size against the budget, and report allocation sites if
+        tracing.
+
+        Returns:
+            The resident set size in bytes.
+        """
+        gc.collect()
+        rss = current_rss()
+        logging.debug('Resident set size: %i kB', rss // 1024)
+        if self.budget is not None and rss > self.budget:
+            logging.warning(
+                'Resident set size %i kB exceeds the memory budget of %i kB',
+                rss // 1024,
+                self.budget // 1024)
+        if self.trace:
+            self.report()
+        return rss
+
+    def report(self) -> None:
+        """Log the allocation sites that grew the most since the previous
+        report, or the largest allocation sites on the first report.  Only
+        the latest snapshot is kept."""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<unknown>')))
+        if self.snapshot is None:
+            stats = snapshot.statistics('lineno')
+        else:
+            stats = snapshot.compare_to(self.snapshot, 'lineno')
+        self.snapshot = snapshot
+        logging.info('Top %i allocation sites:', self.top)
+        for stat in stats[:self.top]:
+            logging.info('%s', stat)
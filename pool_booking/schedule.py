@@ -0,0 +1,202 @@
+"""Functions to parse the schedule page of the NTU facilities booking website
+into a compact form that is cheap to send between processes, and an executor
+that parses schedule pages in a process pool so that many accounts can poll at
+once without the parse holding the GIL of the calling process."""
+
+
+from typing import Dict, Optional, Tuple, Union
+
+
+import concurrent.futures
+import concurrent.futures.process
+import datetime
+import logging
+import multiprocessing
+import re
+
+
+import bs4
+
+
+# Each entry is (proleptic Gregorian ordinal of the date, hour, lane info of
+# every free lane at that time in the order they appear on the page).
+CompactSchedule = Tuple[Tuple[int, int, Tuple[str, ...]], ...]
+
+
+SCHEDULE_STRAINER = bs4.SoupStrainer(
+    'table',
+    style='border-collapse:collapse;')
+
+
+def parse_schedule(page: Union[bytes, str]) -> CompactSchedule:
+    """Parse the schedule page.  Note: this code is very brittle and small
+    changes to the format of the booking page could break it.
+
+    Args:
+        page: raw contents of the schedule page.
+
+    Returns:
+        The schedule in compact form: one (date ordinal, hour, free lanes)
+        entry per booking slot.  If there are no free lanes for a slot, its
+        lanes are an empty tuple.
+
+    Raises:
+        AttributeError: if the page format is not recognized.
+    """
+    soup = bs4.BeautifulSoup(
+        page,
+        features='html.parser',
+        parse_only=SCHEDULE_STRAINER)
+    try:
+        rows = soup.find(
+            'table',
+            style='border-collapse:collapse;').find_all('tr')
+        dates = []
+        for cell in rows[0].find_all('td')[2:]:
+            date = re.match(
+                r'(?P<day>\d{2})(?P<month>\D{3})\s+(?P<year>\d{4})',
+                cell.get_text()).groupdict()
+            dates.append(datetime.date(
+                int(date['year']),
+                datetime.datetime.strptime(date['month'], '%b').month,
+                int(date['day'])).toordinal())
+        lanes = {}
+        hour = 0
+        for row in rows[1:]:
+            cells = row.find_all('td')
+            if len(cells) == 10:
+                hour = int(
+                    re.match(
+                        r'(\d{2})\d{2}\s+\-\s+\d{4}',
+                        cells[0].get_text())[1])
+                cells = cells[1:]
+            cells = cells[1:]
+            for date, cell in zip(dates, cells):
+                content = cell.find('input')
+                free = lanes.setdefault((date, hour), [])
+                if content:
+                    free.append(content.get('value'))
+        return tuple(
+            (date, hour, tuple(free))
+            for (date, hour), free in lanes.items())
+    finally:
+        # Parse trees are full of reference cycles; tear them down now rather
+        # than waiting for the garbage collector.
+        soup.decompose()
+
+
+def schedule_slots(
+        schedule: CompactSchedule) -> Dict[datetime.datetime, Optional[str]]:
+    """Expand a compact schedule into the form returned by
+    Booker.check_schedule.
+
+    Args:
+        schedule: the schedule in compact form.
+
+    Returns:
+        Dictionary whose keys are the start of each booking slot and whose
+        values are the lane information of the last free lane at that time,
+        or None if no lanes are free.
+    """
+    slots = {}
+    for date, hour, free in schedule:
+        start = datetime.datetime.fromordinal(date).replace(hour=hour)
+        slots[start] = free[-1] if free else None
+    return slots
+
+
+class ParseExecutor:
+    """ParseExecutor parses schedule pages in a pool of worker processes.  If
+    no pool is available, or the pool breaks, pages are parsed on the calling
+    thread instead.  Workers are spawned rather than forked, since they start
+    on the first submit, while other threads may hold locks that a forked
+    child would inherit held.
+
+    Args:
+        workers: number of worker processes, None for one per CPU, or 0 to
+            always parse on the calling thread.
+    """
+
+    def __init__(self, workers: Optional[int] = None) -> None:
+        self.pool = None
+        if workers == 0:
+            return
+        try:
+            self.pool = concurrent.futures.ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context('spawn'))
+        except (NotImplementedError, OSError, ValueError) as error:
+            # ValueError is raised for more workers than the platform allows,
+            # e.g. more than 61 on Windows.
+            logging.warning(
+                'Could not start parse processes, parsing in process: %s',
+                str(error))
+
+    def submit(
+            self,
+            page: Union[bytes, str]) -> concurrent.futures.Future:
+        """Submit a schedule page to be parsed without waiting for the result.
+        Event loops can wait for the result with asyncio.wrap_future.  If no
+        pool is available, the page is parsed before this method returns.
+
+        Args:
+            page: raw contents of the schedule page.
+
+        Returns:
+            A future holding the schedule in compact form, see
+            parse_schedule, or the AttributeError raised if the page format is
+            not recognized.
+        """
+        # Read the pool once: another thread may shut it down at any time.
+        pool = self.pool
+        if pool is not None:
+            try:
+                return pool.submit(parse_schedule, page)
+            except RuntimeError as error:
+                logging.warning(
+                    'Parse processes unavailable, parsing in process: %s',
+                    str(error))
+                if isinstance(
+                        error,
+                        concurrent.futures.process.BrokenProcessPool):
+                    self.shutdown()
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(parse_schedule(page))
+        except AttributeError as error:
+            future.set_exception(error)
+        return future
+
+    def parse(self, page: Union[bytes, str]) -> CompactSchedule:
+        """Parse a schedule page, waiting for the result.
+
+        Args:
+            page: raw contents of the schedule page.
+
+        Returns:
+            The schedule in compact form, see parse_schedule.
+
+        Raises:
+            AttributeError: if the page format is not recognized.
+        """
+        try:
+            return self.submit(page).result()
+        except concurrent.futures.process.BrokenProcessPool as error:
+            logging.warning(
+                'Parse processes failed, parsing in process: %s',
+                str(error))
+            self.shutdown()
+            return parse_schedule(page)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes.  Later pages are parsed on the calling
+        thread."""
+        pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def __enter__(self) -> 'ParseExecutor':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
@@ -5,13 +5,19 @@ from typing import Dict, NamedTuple
 
 
 import collections
+import csv
 import datetime
 import os
+import shutil
+import tempfile
 import unittest
 import unittest.mock
 
 
 import pool_booking.booking
+import pool_booking.clock
+import pool_booking.history
+import pool_booking.schedule
 
 
 TEST_COOKIE_JAR = {
@@ -29,7 +35,7 @@ TEST_COOKIE_JAR = {
 
 MockResponse = collections.namedtuple(
     'MockResponse',
-    ['cookies', 'headers', 'status_code', 'text'])
+    ['cookies', 'headers', 'status_code', 'text', 'content'])
 
 
 class MockCookieJar(NamedTuple):
@@ -59,7 +65,8 @@ def mock_request_fail(url: str, **kwargs) -> MockResponse:
         cookies={},
         headers={**kwargs['headers'], **{'Referer': url}},
         status_code=404,
-        text='')
+        text='',
+        content=b'')
 
 
 def mock_auth_success(url: str, **kwargs) -> MockResponse:
@@ -80,7 +87,8 @@ def mock_auth_success(url: str, **kwargs) -> MockResponse:
         cookies=MockCookieJar(TEST_COOKIE_JAR),
         headers={**kwargs['headers'], **{'Referer': url}},
         status_code=200,
-        text=text)
+        text=text,
+        content=text.encode())
 
 
 def mock_schedule_fchange(url: str, **kwargs) -> MockResponse:
@@ -100,7 +108,8 @@ def mock_schedule_fchange(url: str, **kwargs) -> MockResponse:
         cookies=MockCookieJar(TEST_COOKIE_JAR),
         headers={**kwargs['headers'], **{'Referer': url}},
         status_code=200,
-        text=text)
+        text=text,
+        content=text.encode())
 
 
 def mock_schedule_success(url: str, **kwargs) -> MockResponse:
@@ -120,7 +129,8 @@ def mock_schedule_success(url: str, **kwargs) -> MockResponse:
         cookies=MockCookieJar(TEST_COOKIE_JAR),
         headers={**kwargs['headers'], **{'Referer': url}},
         status_code=200,
-        text=text)
+        text=text,
+        content=text.encode())
 
 
 def mock_book_invalidaccess(url: str, **kwargs) -> MockResponse:
@@ -145,7 +155,8 @@ def mock_book_invalidaccess(url: str, **kwargs) -> MockResponse:
         cookies=MockCookieJar(TEST_COOKIE_JAR),
         headers={**kwargs['headers'], **{'Referer': url}},
         status_code=200,
-        text=text)
+        text=text,
+        content=text.encode())
 
 
 def mock_book_success(url: str, **kwargs) -> MockResponse:
@@ -166,7 +177,8 @@ def mock_book_success(url: str, **kwargs) -> MockResponse:
         cookies=MockCookieJar(TEST_COOKIE_JAR),
         headers={**kwargs['headers'], **{'Referer': url}},
         status_code=200,
-        text=text)
+        text=text,
+        content=text.encode())
 
 
 class TestConstructor(unittest.TestCase):
@@ -263,6 +275,53 @@ class TestCheckSchedule(unittest.TestCase):
         self.assertIn('headers', mock_get.call_args.kwargs)
         mock_get.assert_called_once()
 
+    @unittest.mock.patch('requests.get', side_effect=mock_schedule_success)
+    def test_get_success_executor(self, mock_get) -> None:
+        """Ensure that the check_schedule method gives the same result when
+        the page is parsed by a parse executor."""
+        booker = pool_booking.booking.Booker('abc', 'def', 'ghi')
+        slots = booker.check_schedule()
+        with pool_booking.schedule.ParseExecutor(2) as executor:
+            booker.parser = executor
+            self.assertEqual(slots, booker.check_schedule())
+        self.assertEqual(
+            '2SP2SP2522-Jul-20211',
+            slots[datetime.datetime(2021, 7, 22, 8)])
+        self.assertIsNone(slots[datetime.datetime(2021, 7, 19, 8)])
+        self.assertEqual(2, mock_get.call_count)
+
+    @unittest.mock.patch('requests.get', side_effect=mock_schedule_success)
+    def test_get_success_history(self, mock_get) -> None:
+        """Ensure that the fetch_schedule method records each snapshot to
+        the history store at the server's time."""
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'history.csv')
+            clock = pool_booking.clock.ServerClock()
+            booker = pool_booking.booking.Booker(
+                'abc',
+                'def',
+                'ghi',
+                clock=clock,
+                history=pool_booking.history.AvailabilityStore(path))
+            with unittest.mock.patch.object(
+                    clock,
+                    'server_now',
+                    return_value=datetime.datetime(2021, 7, 18, 12)):
+                schedule = booker.fetch_schedule()
+            with open(path, newline='') as csvfile:
+                rows = list(csv.reader(csvfile))
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(
+            sum(len(lanes) or 1 for _, _, lanes in schedule),
+            len(rows))
+        self.assertIn(
+            [str(datetime.date(2021, 7, 22).toordinal()), '8', '1', 'S',
+             str(3 * 24 * 60 + 20 * 60)],
+            rows)
+        mock_get.assert_called_once()
+
 
 class TestBookSlot(unittest.TestCase):
     """Test case for the Booker class's book_slot method."""
@@ -272,8 +331,13 @@ class TestBookSlot(unittest.TestCase):
         """Ensure that the book_slot method raises an exception on post
         failure."""
         booker = pool_booking.booking.Booker('abc', 'def', 'ghi')
-        with self.assertRaises(pool_booking.booking.BookingError):
+        with self.assertRaises(pool_booking.booking.BookingError) as context:
             booker.book_slot(datetime.datetime.now(), '2SP2SP2201-Aug-20211')
+        # The page may be the result of an expired session, so it must not be
+        # reported as an unavailable slot.
+        self.assertNotIsInstance(
+            context.exception,
+            pool_booking.booking.SlotUnavailableError)
         self.assertIn('headers', mock_post.call_args.kwargs)
         self.assertIn('data', mock_post.call_args.kwargs)
 
@@ -282,7 +346,7 @@ class TestBookSlot(unittest.TestCase):
         """Ensure that the book_slot method raises an exception when the
         'Invalid access' response occurs on the confirmation request."""
         booker = pool_booking.booking.Booker('abc', 'def', 'ghi')
-        with self.assertRaises(pool_booking.booking.BookingError):
+        with self.assertRaises(pool_booking.booking.SlotUnavailableError):
             booker.book_slot(datetime.datetime.now(), '2SP2SP2201-Aug-20211')
         self.assertIn('headers', mock_post.call_args.kwargs)
         self.assertIn('data', mock_post.call_args.kwargs)
@@ -0,0 +1,145 @@
+"""Unit test cases for the clock module."""
+
+
+import collections
+import concurrent.futures
+import datetime
+import email.utils
+import math
+import random
+import statistics
+import sys
+import unittest
+
+
+import pool_booking.clock
+
+
+MockResponse = collections.namedtuple('MockResponse', ['headers'])
+
+
+def date_header(timestamp: float) -> str:
+    """Format a timestamp as an HTTP Date header.
+
+    Args:
+        timestamp: seconds since the epoch.
+
+    Returns:
+        The timestamp formatted as it would appear in a Date header.
+    """
+    return email.utils.formatdate(timestamp, usegmt=True)
+
+
+class TestSample(unittest.TestCase):
+    """Test case for the ServerClock class's sample method."""
+
+    def test_no_samples(self) -> None:
+        """Ensure that the local time is used before any samples are taken."""
+        clock = pool_booking.clock.ServerClock()
+        target = datetime.datetime(2021, 7, 22, 8)
+        self.assertEqual(target, clock.send_time(target))
+        self.assertIsNone(clock.offset)
+
+    def test_missing_date(self) -> None:
+        """Ensure that responses without a valid Date header are ignored."""
+        clock = pool_booking.clock.ServerClock()
+        clock.sample(MockResponse(headers={}), 1000.0, 1000.2)
+        clock.sample(MockResponse(headers={'Date': 'garbage'}), 1000.0, 1000.2)
+        self.assertIsNone(clock.offset)
+        self.assertIsNone(clock.rtt)
+
+    def test_offset(self) -> None:
+        """Ensure that the offset and round trip time are estimated from the
+        Date header and the request timing."""
+        clock = pool_booking.clock.ServerClock()
+        clock.sample(
+            MockResponse(headers={'Date': date_header(1000003.0)}),
+            1000000.0,
+            1000000.4)
+        self.assertAlmostEqual(3.3, clock.offset)
+        self.assertAlmostEqual(0.4, clock.rtt)
+        target = datetime.datetime(2021, 7, 22, 8)
+        self.assertEqual(
+            target - datetime.timedelta(seconds=3.5),
+            clock.send_time(target))
+
+    def test_intersection(self) -> None:
+        """Ensure that the offset is the middle of the bounds allowed by all
+        samples and that samples are dropped when the offset changes."""
+        clock = pool_booking.clock.ServerClock()
+        clock.sample(
+            MockResponse(headers={'Date': date_header(1000000.0)}),
+            1000000.0,
+            1000000.2)
+        clock.sample(
+            MockResponse(headers={'Date': date_header(1000011.0)}),
+            1000010.5,
+            1000010.6)
+        self.assertAlmostEqual(0.7, clock.offset)
+        self.assertAlmostEqual(0.3, clock.uncertainty)
+        clock.sample(
+            MockResponse(headers={'Date': date_header(1000025.0)}),
+            1000020.0,
+            1000020.2)
+        self.assertEqual(1, len(clock.samples))
+        self.assertAlmostEqual(5.4, clock.offset)
+
+    def test_error_shrinks(self) -> None:
+        """Ensure that the offset error shrinks well below the one second
+        resolution of the Date header as samples are taken."""
+        rand = random.Random(1)
+        first = []
+        last = []
+        for _ in range(100):
+            offset = rand.uniform(-2.0, 2.0)
+            clock = pool_booking.clock.ServerClock()
+            sent = 1000000.0 + rand.random()
+            for count in range(20):
+                rtt = rand.uniform(0.04, 0.12)
+                server = sent + rand.uniform(0.0, rtt) + offset
+                clock.sample(
+                    MockResponse(
+                        headers={'Date': date_header(math.floor(server))}),
+                    sent,
+                    sent + rtt)
+                if count == 0:
+                    first.append(abs(clock.offset - offset))
+                sent += rand.uniform(5.0, 60.0)
+            last.append(abs(clock.offset - offset))
+        self.assertLess(statistics.median(last), statistics.median(first))
+        self.assertLess(statistics.median(last), 0.05)
+        self.assertLess(sorted(last)[89], 0.1)
+
+    def test_concurrent(self) -> None:
+        """Ensure that one clock can be sampled from many threads at
+        once."""
+        clock = pool_booking.clock.ServerClock(window=8)
+
+        def sample(seed: int) -> None:
+            rand = random.Random(seed)
+            for _ in range(2000):
+                sent = 1000000.0 + rand.uniform(0.0, 1000.0)
+                # Alternate between two offsets so that older samples keep
+                # being dropped while other threads walk the samples.
+                offset = 0.2 if rand.random() < 0.5 else 3.7
+                clock.sample(
+                    MockResponse(headers={
+                        'Date': date_header(math.floor(sent + offset))}),
+                    sent,
+                    sent + 0.01)
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with concurrent.futures.ThreadPoolExecutor(8) as pool:
+                for future in [pool.submit(sample, seed) for seed in range(8)]:
+                    future.result()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertTrue(
+            -1.0 < clock.offset < 1.0 or 2.5 < clock.offset < 5.0)
+        self.assertLessEqual(len(clock.samples), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+"""Unit test cases for the coordinator module."""
+
+
+from typing import List
+
+
+import datetime
+import unittest
+import unittest.mock
+
+
+import requests
+
+
+import pool_booking.booking
+import pool_booking.coordinator
+
+
+DATE = datetime.date(2021, 7, 22).toordinal()
+SLOT = datetime.datetime(2021, 7, 22, 8)
+SCHEDULE = (
+    (DATE, 8, ('2SP2SP0122-Jul-20211', '2SP2SP0222-Jul-20211')),
+    (DATE, 9, ()))
+
+
+def make_bookers(count: int) -> List[pool_booking.booking.Booker]:
+    """Create bookers whose requests to the server are mocked.
+
+    Args:
+        count: number of bookers to create.
+
+    Returns:
+        Bookers whose authenticate, fetch_schedule and book_slot methods are
+        mocks.  fetch_schedule returns the test schedule.
+    """
+    bookers = []
+    for idx in range(count):
+        booker = pool_booking.booking.Booker('abc', 'def', f'ghi{idx}')
+        booker.authenticate = unittest.mock.Mock()
+        booker.fetch_schedule = unittest.mock.Mock(return_value=SCHEDULE)
+        booker.book_slot = unittest.mock.Mock()
+        bookers.append(booker)
+    return bookers
+
+
+class TestAssign(unittest.TestCase):
+    """Test case for the Coordinator class's assign method."""
+
+    def test_distinct_lanes(self) -> None:
+        """Ensure that each lane is assigned at most once and that claims
+        without a free lane are given None."""
+        bookers = make_bookers(4)
+        claims = [
+            pool_booking.coordinator.Claim(bookers[0], SLOT),
+            pool_booking.coordinator.Claim(bookers[1], SLOT),
+            pool_booking.coordinator.Claim(bookers[2], SLOT),
+            pool_booking.coordinator.Claim(
+                bookers[3],
+                SLOT + datetime.timedelta(hours=1))]
+        assigned = pool_booking.coordinator.Coordinator().assign(
+            SCHEDULE,
+            claims)
+        self.assertEqual(
+            ['2SP2SP0222-Jul-20211', '2SP2SP0122-Jul-20211', None, None],
+            assigned)
+
+    def test_priority(self) -> None:
+        """Ensure that claims with a higher priority are served first."""
+        bookers = make_bookers(3)
+        claims = [
+            pool_booking.coordinator.Claim(bookers[0], SLOT),
+            pool_booking.coordinator.Claim(bookers[1], SLOT, 1),
+            pool_booking.coordinator.Claim(bookers[2], SLOT, 2)]
+        assigned = pool_booking.coordinator.Coordinator().assign(
+            SCHEDULE,
+            claims)
+        self.assertEqual(
+            [None, '2SP2SP0122-Jul-20211', '2SP2SP0222-Jul-20211'],
+            assigned)
+
+    def test_fairness(self) -> None:
+        """Ensure that among equal priorities, accounts that have booked
+        fewer lanes are served first."""
+        bookers = make_bookers(3)
+        coordinator = pool_booking.coordinator.Coordinator()
+        coordinator.wins[bookers[0].matricno] = 2
+        coordinator.wins[bookers[1].matricno] = 1
+        claims = [
+            pool_booking.coordinator.Claim(booker, SLOT) for booker in bookers]
+        self.assertEqual(
+            [None, '2SP2SP0122-Jul-20211', '2SP2SP0222-Jul-20211'],
+            coordinator.assign(SCHEDULE, claims))
+
+
+class TestBook(unittest.TestCase):
+    """Test case for the Coordinator class's book method."""
+
+    def test_book(self) -> None:
+        """Ensure that one snapshot is taken, each account books a distinct
+        lane and failures are reported per claim."""
+        bookers = make_bookers(4)
+        bookers[0].authenticate.side_effect = \
+            pool_booking.booking.BookingError('Authentication failed')
+        bookers[2].book_slot.side_effect = \
+            pool_booking.booking.BookingError('Booking confirmation failed')
+        coordinator = pool_booking.coordinator.Coordinator()
+        results = coordinator.book([
+            pool_booking.coordinator.Claim(booker, SLOT)
+            for booker in bookers])
+        self.assertIs(bookers[0].authenticate.side_effect, results[0])
+        self.assertIsNone(results[1])
+        self.assertIs(bookers[2].book_slot.side_effect, results[2])
+        self.assertIsInstance(
+            results[3],
+            pool_booking.booking.SlotUnavailableError)
+        bookers[0].fetch_schedule.assert_not_called()
+        bookers[1].fetch_schedule.assert_called_once()
+        bookers[2].fetch_schedule.assert_not_called()
+        self.assertNotEqual(
+            bookers[1].book_slot.call_args,
+            bookers[2].book_slot.call_args)
+        bookers[3].book_slot.assert_not_called()
+        self.assertEqual(1, coordinator.wins[bookers[1].matricno])
+        self.assertEqual(0, coordinator.wins[bookers[2].matricno])
+
+    def test_schedule_unavailable(self) -> None:
+        """Ensure that every claim fails if the schedule cannot be
+        checked."""
+        bookers = make_bookers(2)
+        error = pool_booking.booking.BookingError(
+            'Schedule page not available.')
+        bookers[0].fetch_schedule.side_effect = error
+        results = pool_booking.coordinator.Coordinator().book([
+            pool_booking.coordinator.Claim(booker, SLOT)
+            for booker in bookers])
+        self.assertEqual([error, error], results)
+        bookers[0].book_slot.assert_not_called()
+        bookers[1].book_slot.assert_not_called()
+
+    def test_connection_error(self) -> None:
+        """Ensure that a connection error of one account fails only its own
+        claim."""
+        bookers = make_bookers(3)
+        bookers[0].book_slot.side_effect = requests.ConnectionError()
+        bookers[1].authenticate.side_effect = requests.Timeout()
+        coordinator = pool_booking.coordinator.Coordinator()
+        results = coordinator.book([
+            pool_booking.coordinator.Claim(booker, SLOT)
+            for booker in bookers])
+        self.assertIs(bookers[0].book_slot.side_effect, results[0])
+        self.assertIs(bookers[1].authenticate.side_effect, results[1])
+        self.assertIsNone(results[2])
+        bookers[2].book_slot.assert_called_once()
+        self.assertEqual(0, coordinator.wins[bookers[0].matricno])
+        self.assertEqual(1, coordinator.wins[bookers[2].matricno])
+
+
+if __name__ == '__main__':
+    unittest.main()
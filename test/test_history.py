@@ -0,0 +1,198 @@
+"""Unit test cases for the history module."""
+
+
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+
+import pool_booking.history
+
+
+DATE = datetime.date(2021, 7, 22).toordinal()
+SLOT = datetime.datetime(2021, 7, 22, 8)
+
+
+def lane(number: int) -> str:
+    """Build the lane information of a free lane at the test slot.
+
+    Args:
+        number: lane number.
+
+    Returns:
+        Lane information as found in the schedule.
+    """
+    return f'2SP2SP{number:02d}22-Jul-20211'
+
+
+class TestAvailabilityStore(unittest.TestCase):
+    """Test case for the AvailabilityStore class."""
+
+    def setUp(self) -> None:
+        """Create a temporary directory for the store."""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'history.csv')
+
+    def tearDown(self) -> None:
+        """Remove the temporary directory."""
+        shutil.rmtree(self.directory)
+
+    def record_changes(self) -> pool_booking.history.AvailabilityStore:
+        """Record three snapshots of the test slot: lanes 1 and 2 free, then
+        lane 1 taken and lane 3 freed, then lane 2 taken.
+
+        Returns:
+            The store the snapshots were recorded to.
+        """
+        store = pool_booking.history.AvailabilityStore(self.path)
+        self.assertEqual(0, store.record(
+            ((DATE, 8, (lane(1), lane(2))),),
+            SLOT - datetime.timedelta(hours=30)))
+        self.assertEqual(2, store.record(
+            ((DATE, 8, (lane(2), lane(3))),),
+            SLOT - datetime.timedelta(hours=25, minutes=30)))
+        self.assertEqual(1, store.record(
+            ((DATE, 8, (lane(3),)),),
+            SLOT - datetime.timedelta(minutes=10)))
+        return store
+
+    def test_record(self) -> None:
+        """Ensure that only changes are written and counted by how long
+        before the slot they were observed."""
+        store = self.record_changes()
+        with open(self.path) as csvfile:
+            self.assertEqual(5, len(csvfile.readlines()))
+        self.assertEqual(
+            [
+                pool_booking.history.SlotChanges(
+                    datetime.timedelta(0), 0, 1),
+                pool_booking.history.SlotChanges(
+                    datetime.timedelta(hours=25), 1, 1)],
+            store.changes(SLOT.weekday(), 8))
+        self.assertEqual([], store.changes(SLOT.weekday(), 9))
+
+    def test_no_free_lanes(self) -> None:
+        """Ensure that lanes freed in a slot first seen full are counted."""
+        store = pool_booking.history.AvailabilityStore(self.path)
+        store.record(((DATE, 8, ()),), SLOT - datetime.timedelta(hours=2))
+        self.assertEqual(1, store.record(
+            ((DATE, 8, (lane(4),)),),
+            SLOT - datetime.timedelta(hours=1)))
+        self.assertEqual(1, store.record(
+            ((DATE, 8, ()),),
+            SLOT - datetime.timedelta(minutes=30)))
+
+    def test_reload(self) -> None:
+        """Ensure that the statistics are restored from an existing file."""
+        store = self.record_changes()
+        reloaded = pool_booking.history.AvailabilityStore(self.path)
+        self.assertEqual(
+            store.changes(SLOT.weekday(), 8),
+            reloaded.changes(SLOT.weekday(), 8))
+
+    def test_truncated_row(self) -> None:
+        """Ensure that a row cut short by the daemon being killed is
+        skipped and that rows recorded afterwards are read back."""
+        store = self.record_changes()
+        store.record(
+            ((DATE, 9, (lane(1),)),),
+            SLOT - datetime.timedelta(hours=2))
+        with open(self.path, 'a', newline='') as csvfile:
+            csvfile.write(f'{DATE},8,2,F')
+        with self.assertLogs(level='WARNING'):
+            reloaded = pool_booking.history.AvailabilityStore(self.path)
+        self.assertEqual(
+            store.changes(SLOT.weekday(), 8),
+            reloaded.changes(SLOT.weekday(), 8))
+        store.record(((DATE, 9, ()),), SLOT - datetime.timedelta(hours=1))
+        reloaded = pool_booking.history.AvailabilityStore(self.path)
+        self.assertEqual(
+            [
+                pool_booking.history.SlotChanges(
+                    datetime.timedelta(hours=2), 0, 1)],
+            reloaded.changes(SLOT.weekday(), 9))
+
+    def test_prune(self) -> None:
+        """Ensure that the state of slots that have started is dropped."""
+        store = self.record_changes()
+        store.record(((DATE, 8, ()),), SLOT + datetime.timedelta(minutes=5))
+        self.assertEqual({}, store.free)
+
+
+class TestPollingPlanner(unittest.TestCase):
+    """Test case for the PollingPlanner class."""
+
+    def setUp(self) -> None:
+        """Create a store whose changes for the test slot all happened
+        between 24 and 25 hours before the slot."""
+        self.directory = tempfile.mkdtemp()
+        self.store = pool_booking.history.AvailabilityStore(
+            os.path.join(self.directory, 'history.csv'))
+        self.store.record(
+            ((DATE, 8, (lane(1),)),),
+            SLOT - datetime.timedelta(hours=30))
+        self.store.record(
+            ((DATE, 8, (lane(2),)),),
+            SLOT - datetime.timedelta(hours=24, minutes=30))
+        self.planner = pool_booking.history.PollingPlanner(self.store)
+
+    def tearDown(self) -> None:
+        """Remove the temporary directory."""
+        shutil.rmtree(self.directory)
+
+    def test_no_history(self) -> None:
+        """Ensure that slots without history are polled at the slow
+        interval."""
+        slot = SLOT + datetime.timedelta(hours=1)
+        now = slot - datetime.timedelta(hours=10)
+        self.assertEqual(
+            now + self.planner.slow,
+            self.planner.next_poll(slot, now))
+        now = slot - datetime.timedelta(seconds=10)
+        self.assertEqual(slot, self.planner.next_poll(slot, now))
+
+    def test_busy_window(self) -> None:
+        """Ensure that slots are polled at the fast interval inside a busy
+        window."""
+        now = SLOT - datetime.timedelta(hours=24, minutes=15)
+        self.assertEqual(
+            now + self.planner.fast,
+            self.planner.next_poll(SLOT, now))
+
+    def test_quiet(self) -> None:
+        """Ensure that slots are polled at the slow interval outside busy
+        windows, waking up for the start of the next busy window."""
+        now = SLOT - datetime.timedelta(hours=40)
+        self.assertEqual(
+            now + self.planner.slow,
+            self.planner.next_poll(SLOT, now))
+        now = SLOT - datetime.timedelta(hours=25, minutes=20)
+        self.assertEqual(
+            SLOT - datetime.timedelta(hours=25),
+            self.planner.next_poll(SLOT, now))
+        now = SLOT - datetime.timedelta(hours=2)
+        self.assertEqual(
+            now + self.planner.slow,
+            self.planner.next_poll(SLOT, now))
+
+    def test_taken_only(self) -> None:
+        """Ensure that windows in which lanes were only taken are not
+        busy."""
+        self.store.record(
+            ((DATE, 8, ()),),
+            SLOT - datetime.timedelta(hours=5, minutes=30))
+        self.assertEqual(
+            [24],
+            [
+                window.lead // datetime.timedelta(hours=1)
+                for window in self.planner.busy_windows(SLOT.weekday(), 8)])
+        now = SLOT - datetime.timedelta(hours=5, minutes=15)
+        self.assertEqual(
+            now + self.planner.slow,
+            self.planner.next_poll(SLOT, now))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,9 +5,14 @@ import datetime
 import os
 import time
 import unittest
+import unittest.mock
 
 
 import pool_booking.__main__
+import pool_booking.booking
+import pool_booking.clock
+import pool_booking.history
+import pool_booking.memory
 
 
 class TestGetPreferences(unittest.TestCase):
@@ -34,6 +39,99 @@ class TestGetPreferences(unittest.TestCase):
             pool_booking.__main__.get_preferences(path)
 
 
+class TestGetNextBooking(unittest.TestCase):
+    """Test case for get_next_booking function."""
+
+    def test_given_time(self) -> None:
+        """Ensure that the next booking is found relative to the given time
+        rather than the local clock."""
+        pref = [0, 8, 8, 8, 8, 0, 8]
+        self.assertEqual(
+            datetime.datetime(2021, 7, 21, 8),
+            pool_booking.__main__.get_next_booking(
+                pref,
+                datetime.datetime(2021, 7, 20, 8, 0, 1)))
+
+
+class TestAttemptBooking(unittest.TestCase):
+    """Test case for attempt_booking function."""
+
+    def setUp(self) -> None:
+        """Create a mock booker and a planner that always retries a minute
+        later."""
+        self.booker = unittest.mock.Mock(spec=pool_booking.booking.Booker)
+        self.clock = pool_booking.clock.ServerClock()
+        self.slot = datetime.datetime.now() + datetime.timedelta(days=3)
+        self.planner = unittest.mock.Mock(
+            spec=pool_booking.history.PollingPlanner)
+        self.planner.slow = datetime.timedelta(hours=1)
+        self.planner.next_poll.side_effect = \
+            lambda slot, now: now + datetime.timedelta(minutes=1)
+
+    @unittest.mock.patch('pool_booking.__main__.wait_next_booking')
+    def test_login_failure(self, mock_wait) -> None:
+        """Ensure that a failed login is not retried."""
+        self.booker.book.side_effect = \
+            pool_booking.booking.BookingError('Authentication failed')
+        pool_booking.__main__.attempt_booking(
+            self.booker, self.slot, self.clock, self.planner)
+        self.booker.book.assert_called_once_with(self.slot, authenticate=True)
+        mock_wait.assert_not_called()
+
+    @unittest.mock.patch('pool_booking.__main__.wait_next_booking')
+    def test_retry_unavailable(self, mock_wait) -> None:
+        """Ensure that an unavailable slot is retried without logging in
+        again."""
+        self.booker.book.side_effect = [
+            pool_booking.booking.SlotUnavailableError('No places'),
+            pool_booking.booking.SlotUnavailableError('No places'),
+            None]
+        pool_booking.__main__.attempt_booking(
+            self.booker, self.slot, self.clock, self.planner)
+        self.assertEqual(
+            [True, False, False],
+            [call.kwargs['authenticate']
+             for call in self.booker.book.call_args_list])
+        self.assertEqual(2, mock_wait.call_count)
+
+    @unittest.mock.patch('pool_booking.__main__.wait_next_booking')
+    def test_session_expired(self, mock_wait) -> None:
+        """Ensure that a failure on a reused session logs in again once and
+        stops if it fails again after logging in."""
+        self.booker.book.side_effect = [
+            pool_booking.booking.SlotUnavailableError('No places'),
+            pool_booking.booking.BookingError('Could not parse schedule.'),
+            pool_booking.booking.BookingError('Could not parse schedule.')]
+        pool_booking.__main__.attempt_booking(
+            self.booker, self.slot, self.clock, self.planner)
+        self.assertEqual(
+            [True, False, True],
+            [call.kwargs['authenticate']
+             for call in self.booker.book.call_args_list])
+        self.assertEqual(2, mock_wait.call_count)
+
+    @unittest.mock.patch('pool_booking.__main__.wait_next_booking')
+    def test_monitor(self, mock_wait) -> None:
+        """Ensure that the memory monitor is cycled before each retry."""
+        monitor = unittest.mock.Mock(spec=pool_booking.memory.MemoryMonitor)
+        self.booker.book.side_effect = [
+            pool_booking.booking.SlotUnavailableError('No places'),
+            pool_booking.booking.SlotUnavailableError('No places'),
+            None]
+        pool_booking.__main__.attempt_booking(
+            self.booker, self.slot, self.clock, self.planner, monitor)
+        self.assertEqual(2, monitor.cycle.call_count)
+        self.assertEqual(2, mock_wait.call_count)
+
+    def test_no_planner(self) -> None:
+        """Ensure that without a planner the booking is attempted once."""
+        self.booker.book.side_effect = \
+            pool_booking.booking.SlotUnavailableError('No places')
+        pool_booking.__main__.attempt_booking(
+            self.booker, self.slot, self.clock)
+        self.booker.book.assert_called_once_with(self.slot, authenticate=True)
+
+
 class TestWaitNextBooking(unittest.TestCase):
     """Test case for get_next_booking function."""
 
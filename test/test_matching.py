@@ -0,0 +1,68 @@
+"""Unit test cases for the matching module."""
+
+
+import datetime
+import os
+import unittest
+
+
+import pool_booking.matching
+import pool_booking.schedule
+
+
+THURSDAY = datetime.date(2021, 7, 22).toordinal()
+FRIDAY = datetime.date(2021, 7, 23).toordinal()
+SCHEDULE = (
+    (FRIDAY, 8, ('2SP2SP0123-Jul-20211',)),
+    (THURSDAY, 8, ('2SP2SP0122-Jul-20211', '2SP2SP0222-Jul-20211')),
+    (THURSDAY, 9, ()))
+
+
+class TestPreferenceMatrix(unittest.TestCase):
+    """Test case for the PreferenceMatrix class."""
+
+    def test_match(self) -> None:
+        """Ensure that every user is matched with every wanted slot that has
+        free lanes."""
+        matrix = pool_booking.matching.PreferenceMatrix({
+            'alice': [0, 0, 0, 8, 8, 0, 0],
+            'bob': [0, 0, 0, 9, 0, 0, 0],
+            'carol': [0, 0, 0, 8, 0, 0, 0]})
+        thursday = datetime.datetime(2021, 7, 22, 8)
+        friday = datetime.datetime(2021, 7, 23, 8)
+        thursday_lanes = ('2SP2SP0122-Jul-20211', '2SP2SP0222-Jul-20211')
+        self.assertEqual(
+            [
+                pool_booking.matching.Match(
+                    'alice', thursday, thursday_lanes),
+                pool_booking.matching.Match(
+                    'carol', thursday, thursday_lanes),
+                pool_booking.matching.Match(
+                    'alice', friday, ('2SP2SP0123-Jul-20211',))],
+            matrix.match(SCHEDULE))
+        self.assertEqual(
+            ['alice'],
+            [match.user for match in matrix.match(SCHEDULE, thursday)])
+
+    def test_no_users(self) -> None:
+        """Ensure that an empty matrix matches nothing."""
+        matrix = pool_booking.matching.PreferenceMatrix({})
+        self.assertEqual([], matrix.match(SCHEDULE))
+
+    def test_schedule_page(self) -> None:
+        """Ensure that matching a parsed schedule page agrees with the
+        schedule."""
+        path = os.path.join('test_assets', 'schedule_success.html')
+        with open(path, 'rb') as page:
+            schedule = pool_booking.schedule.parse_schedule(page.read())
+        matrix = pool_booking.matching.PreferenceMatrix(
+            {user: [8] * 7 for user in range(100)})
+        matches = matrix.match(schedule)
+        free = [
+            lanes for date, hour, lanes in schedule if hour == 8 and lanes]
+        self.assertEqual(100 * len(free), len(matches))
+        self.assertTrue(all(match.slot.hour == 8 for match in matches))
+
+
+if __name__ == '__main__':
+    unittest.main()
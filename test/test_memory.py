@@ -0,0 +1,59 @@
+"""Unit test cases for the memory module."""
+
+
+import tracemalloc
+import unittest
+
+
+import pool_booking.memory
+
+
+class TestCurrentRss(unittest.TestCase):
+    """Test case for current_rss function."""
+
+    def test_current_rss(self) -> None:
+        """Ensure that the resident set size is a positive number of
+        bytes."""
+        self.assertGreater(pool_booking.memory.current_rss(), 0)
+
+
+class TestMemoryMonitor(unittest.TestCase):
+    """Test case for the MemoryMonitor class."""
+
+    def tearDown(self) -> None:
+        """Stop tracing memory allocations if a test started it."""
+        tracemalloc.stop()
+
+    def test_within_budget(self) -> None:
+        """Ensure that no warning is logged when memory use is within the
+        budget."""
+        monitor = pool_booking.memory.MemoryMonitor(budget=2 ** 62)
+        with self.assertLogs(level='DEBUG') as logs:
+            self.assertGreater(monitor.cycle(), 0)
+        self.assertFalse(
+            [record for record in logs.records if record.levelname != 'DEBUG'])
+
+    def test_over_budget(self) -> None:
+        """Ensure that a warning is logged when memory use exceeds the
+        budget."""
+        monitor = pool_booking.memory.MemoryMonitor(budget=1)
+        with self.assertLogs(level='WARNING'):
+            monitor.cycle()
+
+    def test_trace(self) -> None:
+        """Ensure that allocation sites are reported every cycle and that
+        only the latest snapshot is kept."""
+        monitor = pool_booking.memory.MemoryMonitor(trace=True, top=3)
+        self.assertTrue(tracemalloc.is_tracing())
+        with self.assertLogs(level='INFO') as logs:
+            monitor.cycle()
+        first = monitor.snapshot
+        self.assertIsNotNone(first)
+        self.assertLessEqual(len(logs.records), 4)
+        with self.assertLogs(level='INFO'):
+            monitor.cycle()
+        self.assertIsNot(first, monitor.snapshot)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""Unit test cases for the schedule module."""
+
+
+import asyncio
+import datetime
+import os
+import pickle
+import unittest
+import unittest.mock
+
+
+import pool_booking.schedule
+
+
+def read_asset(name: str) -> bytes:
+    """Read a test asset.
+
+    Args:
+        name: file name of the asset.
+
+    Returns:
+        The raw contents of the asset.
+    """
+    with open(os.path.join('test_assets', name), 'rb') as asset:
+        return asset.read()
+
+
+class TestParseSchedule(unittest.TestCase):
+    """Test case for parse_schedule function."""
+
+    def test_success(self) -> None:
+        """Ensure that every slot and every free lane is parsed from a valid
+        schedule page."""
+        schedule = pool_booking.schedule.parse_schedule(
+            read_asset('schedule_success.html'))
+        self.assertEqual(96, len(schedule))
+        entries = {(date, hour): free for date, hour, free in schedule}
+        free = entries[(datetime.date(2021, 7, 22).toordinal(), 8)]
+        self.assertEqual(25, len(free))
+        self.assertEqual('2SP2SP0122-Jul-20211', free[0])
+        self.assertEqual(
+            (), entries[(datetime.date(2021, 7, 19).toordinal(), 8)])
+        self.assertEqual(schedule, pickle.loads(pickle.dumps(schedule)))
+
+    def test_format_change(self) -> None:
+        """Ensure that an exception is raised if the schedule page format has
+        changed."""
+        with self.assertRaises(AttributeError):
+            pool_booking.schedule.parse_schedule(
+                read_asset('schedule_formatchange.html'))
+
+
+class TestScheduleSlots(unittest.TestCase):
+    """Test case for schedule_slots function."""
+
+    def test_schedule_slots(self) -> None:
+        """Ensure that the last free lane of each slot is kept."""
+        date = datetime.date(2021, 7, 22).toordinal()
+        slots = pool_booking.schedule.schedule_slots((
+            (date, 8, ('a', 'b')),
+            (date, 9, ())))
+        self.assertEqual(
+            {
+                datetime.datetime(2021, 7, 22, 8): 'b',
+                datetime.datetime(2021, 7, 22, 9): None},
+            slots)
+
+
+class TestParseExecutor(unittest.TestCase):
+    """Test case for the ParseExecutor class."""
+
+    def test_in_process(self) -> None:
+        """Ensure that pages are parsed on the calling thread when no workers
+        are requested."""
+        page = read_asset('schedule_success.html')
+        with pool_booking.schedule.ParseExecutor(0) as executor:
+            self.assertIsNone(executor.pool)
+            self.assertEqual(
+                pool_booking.schedule.parse_schedule(page),
+                executor.parse(page))
+
+    def test_spawn(self) -> None:
+        """Ensure that worker processes are spawned rather than forked."""
+        with unittest.mock.patch(
+                'concurrent.futures.ProcessPoolExecutor') as mock_pool:
+            pool_booking.schedule.ParseExecutor(2)
+        self.assertEqual(
+            'spawn',
+            mock_pool.call_args.kwargs['mp_context'].get_start_method())
+
+    def test_invalid_workers(self) -> None:
+        """Ensure that pages are parsed on the calling thread if the pool
+        cannot be created with the requested number of workers."""
+        page = read_asset('schedule_success.html')
+        with pool_booking.schedule.ParseExecutor(-1) as executor:
+            self.assertIsNone(executor.pool)
+            self.assertEqual(
+                pool_booking.schedule.parse_schedule(page),
+                executor.parse(page))
+
+    def test_pool(self) -> None:
+        """Ensure that pages parsed in worker processes give the same result
+        and that parse errors are raised to the caller."""
+        page = read_asset('schedule_success.html')
+        with pool_booking.schedule.ParseExecutor(2) as executor:
+            self.assertEqual(
+                pool_booking.schedule.parse_schedule(page),
+                executor.parse(page))
+            with self.assertRaises(AttributeError):
+                executor.parse(read_asset('schedule_formatchange.html'))
+        self.assertIsNone(executor.pool)
+
+    def test_submit(self) -> None:
+        """Ensure that submitted pages can be awaited from an event loop."""
+        page = read_asset('schedule_success.html')
+
+        async def parse(executor):
+            return await asyncio.wrap_future(executor.submit(page))
+
+        loop = asyncio.new_event_loop()
+        try:
+            for workers in (0, 2):
+                with pool_booking.schedule.ParseExecutor(workers) as executor:
+                    self.assertEqual(
+                        pool_booking.schedule.parse_schedule(page),
+                        loop.run_until_complete(parse(executor)))
+        finally:
+            loop.close()
+        with pool_booking.schedule.ParseExecutor(0) as executor:
+            future = executor.submit(read_asset('schedule_formatchange.html'))
+            self.assertIsInstance(future.exception(), AttributeError)
+
+    def test_pool_shut_down(self) -> None:
+        """Ensure that pages are parsed in process if the pool is shut down
+        by another thread while a page is being submitted."""
+        page = read_asset('schedule_success.html')
+        with pool_booking.schedule.ParseExecutor(2) as executor:
+            executor.pool.shutdown()
+            self.assertEqual(
+                pool_booking.schedule.parse_schedule(page),
+                executor.parse(page))
+
+
+if __name__ == '__main__':
+    unittest.main()